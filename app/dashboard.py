@@ -7,7 +7,7 @@ import numpy as np
 import pandas as pd
 import streamlit as st
 
-from app.data import load_forecast_df, load_metrics_df
+from app.data import load_forecast_error_df, load_metrics_df
 
 
 st.set_page_config(page_title="Energy Demand Forecast", layout="wide")
@@ -105,10 +105,62 @@ st.markdown(
 
 
 def _normalize(series: np.ndarray) -> np.ndarray:
+    # Normalizes in place; only called at import on freshly built profile arrays.
     total = series.sum()
-    return series / total if total else series
+    return np.divide(series, total, out=series) if total else series
 
 
+_HOURS = np.arange(24)
+_HOUR_LABELS = np.array([f"{h:02d}:00" for h in range(24)])
+
+_BASE = _normalize(
+    0.4
+    + 0.7 * np.exp(-((_HOURS - 8) / 3.4) ** 2)
+    + 1.1 * np.exp(-((_HOURS - 18) / 4.2) ** 2)
+)
+_RES_PROFILE = _normalize(_BASE + 0.3 * np.exp(-((_HOURS - 20) / 2.5) ** 2))
+_COMM_PROFILE = _normalize(0.2 + 1.2 * np.exp(-((_HOURS - 13) / 3.6) ** 2))
+_IND_PROFILE = _normalize(0.85 + 0.1 * np.cos((_HOURS - 4) * 0.3))
+
+SEASONAL_FACTOR = {
+    "January": 1.12,
+    "February": 1.08,
+    "March": 1.03,
+    "April": 0.98,
+    "May": 0.95,
+    "June": 0.97,
+    "July": 1.04,
+    "August": 1.06,
+    "September": 1.0,
+    "October": 1.03,
+    "November": 1.07,
+    "December": 1.15,
+}
+
+
+def _clip(value: float, lower: float, upper: float) -> float:
+    return min(max(value, lower), upper)
+
+
+def _segment_scales(
+    weekend: bool, seasonal_factor: float, max_temp: float, feels_like: float
+) -> tuple[float, float, float]:
+    # Plain float math: np.clip on scalars pays ufunc dispatch for every factor.
+    weather_factor = 1.0 + _clip((16 - max_temp) * 0.025, -0.12, 0.35)
+    feels_factor = 1.0 + _clip((16 - feels_like) * 0.015, -0.08, 0.2)
+
+    res_scale = weather_factor * feels_factor * seasonal_factor
+    comm_scale = (weather_factor * 0.8 + 0.2) * seasonal_factor
+    ind_scale = 0.95 * seasonal_factor
+
+    if weekend:
+        res_scale *= 1.08
+        comm_scale *= 0.78
+        ind_scale *= 0.9
+    return res_scale, comm_scale, ind_scale
+
+
+@st.cache_data(show_spinner=False, max_entries=128)
 def build_hourly_forecast(
     weekend: bool,
     month: str,
@@ -120,61 +172,23 @@ def build_hourly_forecast(
     commercial_customers: int,
     industrial_customers: int,
 ) -> pd.DataFrame:
-    hours = np.arange(24)
-
-    base = 0.4 + 0.7 * np.exp(-((hours - 8) / 3.4) ** 2) + 1.1 * np.exp(
-        -((hours - 18) / 4.2) ** 2
+    res_scale, comm_scale, ind_scale = _segment_scales(
+        weekend, SEASONAL_FACTOR[month], max_temp, feels_like
     )
-    base = _normalize(base)
-
-    res_profile = _normalize(base + 0.3 * np.exp(-((hours - 20) / 2.5) ** 2))
-    comm_profile = _normalize(0.2 + 1.2 * np.exp(-((hours - 13) / 3.6) ** 2))
-    ind_profile = _normalize(0.85 + 0.1 * np.cos((hours - 4) * 0.3))
-
-    temp_delta = 16 - max_temp
-    weather_factor = 1.0 + np.clip(temp_delta * 0.025, -0.12, 0.35)
-    feels_factor = 1.0 + np.clip((16 - feels_like) * 0.015, -0.08, 0.2)
-    wind_factor = 1.0 + np.clip(wind_speed * 0.01, 0.0, 0.15)
-    humidity_factor = 1.0 + np.clip((humidity - 55) * 0.002, -0.05, 0.12)
-
-    seasonal_factor = {
-        "January": 1.12,
-        "February": 1.08,
-        "March": 1.03,
-        "April": 0.98,
-        "May": 0.95,
-        "June": 0.97,
-        "July": 1.04,
-        "August": 1.06,
-        "September": 1.0,
-        "October": 1.03,
-        "November": 1.07,
-        "December": 1.15,
-    }[month]
-
-    res_scale = weather_factor * feels_factor * seasonal_factor
-    comm_scale = (weather_factor * 0.8 + 0.2) * seasonal_factor
-    ind_scale = 0.95 * seasonal_factor
-
-    if weekend:
-        res_scale *= 1.08
-        comm_scale *= 0.78
-        ind_scale *= 0.9
 
     res_daily = residential_customers * 12.0 * res_scale
     comm_daily = commercial_customers * 32.0 * comm_scale
     ind_daily = industrial_customers * 70.0 * ind_scale
 
+    segments = np.column_stack(
+        (_RES_PROFILE * res_daily, _COMM_PROFILE * comm_daily, _IND_PROFILE * ind_daily)
+    )
     df = pd.DataFrame(
-        {
-            "hour": hours,
-            "Residential": res_profile * res_daily,
-            "Commercial": comm_profile * comm_daily,
-            "Industrial": ind_profile * ind_daily,
-        }
+        np.column_stack((segments, segments.sum(axis=1))),
+        columns=["Residential", "Commercial", "Industrial", "Total"],
     )
-    df["Total"] = df[["Residential", "Commercial", "Industrial"]].sum(axis=1)
-    df["label"] = df["hour"].apply(lambda h: f"{h:02d}:00")
+    df.insert(0, "hour", _HOURS)
+    df["label"] = _HOUR_LABELS
     return df
 
 
@@ -296,20 +310,16 @@ with right:
         unsafe_allow_html=True,
     )
 
-    chart_data = forecast.melt(
-        id_vars=["hour", "label"],
-        value_vars=["Total", "Residential", "Commercial", "Industrial"],
-        var_name="Segment",
-        value_name="kwh",
-    )
-
+    segment_names = ["Total", "Residential", "Commercial", "Industrial"]
     color_scale = alt.Scale(
-        domain=["Total", "Residential", "Commercial", "Industrial"],
+        domain=segment_names,
         range=["#2F6CF6", "#22C55E", "#F59E0B", "#EF4444"],
     )
 
+    # Send the wide frame and let Vega-Lite fold it to long form in the browser.
     chart = (
-        alt.Chart(chart_data)
+        alt.Chart(forecast[["hour", "label", *segment_names]])
+        .transform_fold(segment_names, as_=["Segment", "kwh"])
         .mark_line(strokeWidth=3, interpolate="monotone")
         .encode(
             x=alt.X("hour:Q", axis=alt.Axis(labelExpr="datum.value + ':00'", title="Hour")),
@@ -357,7 +367,7 @@ st.markdown("</div>", unsafe_allow_html=True)
 
 with st.expander("Historical SARIMA Forecast (Daily Aggregate)"):
     try:
-        forecast_df = load_forecast_df()
+        forecast_df = load_forecast_error_df()
     except FileNotFoundError as exc:
         st.error(str(exc))
         st.stop()
@@ -383,20 +393,14 @@ with st.expander("Historical SARIMA Forecast (Daily Aggregate)"):
         start_date = selected_range
         end_date = selected_range
 
-    filtered = forecast_df[
+    # Rows are already sorted by day and carry precomputed error columns.
+    filtered = forecast_df.loc[
         (forecast_df["day"] >= start_date) & (forecast_df["day"] <= end_date)
-    ].sort_values("day")
+    ]
 
     if filtered.empty:
         st.warning("No data available for the selected date range.")
     else:
-        filtered["abs_error"] = (
-            filtered["forecast_energy_sum"] - filtered["actual_energy_sum"]
-        ).abs()
-        filtered["ape"] = (
-            filtered["abs_error"] / filtered["actual_energy_sum"].replace(0, pd.NA)
-        ).astype(float)
-
         mape = float(filtered["ape"].mean(skipna=True) * 100)
         mae = float(filtered["abs_error"].mean())
 
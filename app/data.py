@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+from bisect import bisect_left, bisect_right
 from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:  # Optional faster CSV reader; fall back to pandas.
+    pacsv = None
+
 
 OUTPUT_ENV_VAR = "FF_OUTPUT_DIR"
 
@@ -32,12 +40,42 @@ def load_forecast_df() -> pd.DataFrame:
     if not path.exists():
         raise FileNotFoundError(f"Forecast file not found: {path}")
 
-    df = pd.read_csv(path)
+    if pacsv is not None:
+        # Keep day as text so any timestamp layout pandas accepts still loads.
+        table = pacsv.read_csv(
+            path, convert_options=pacsv.ConvertOptions(column_types={"day": pa.string()})
+        )
+        df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    else:
+        df = pd.read_csv(path)
     if "day" in df.columns:
         df["day"] = pd.to_datetime(df["day"]).dt.date
+        df = df.sort_values("day", kind="stable", ignore_index=True)
     return df
 
 
+@lru_cache(maxsize=1)
+def load_forecast_error_df() -> pd.DataFrame:
+    df = load_forecast_df()
+    abs_error = (df["forecast_energy_sum"] - df["actual_energy_sum"]).abs()
+    ape = (abs_error / df["actual_energy_sum"].replace(0, pd.NA)).astype(float)
+    return df.assign(abs_error=abs_error, ape=ape)
+
+
+@lru_cache(maxsize=1)
+def _forecast_days() -> np.ndarray:
+    # Null days sort last; only the dated prefix is searchable by range.
+    days = load_forecast_df()["day"]
+    return days[days.notna()].to_numpy()
+
+
+@lru_cache(maxsize=1)
+def _forecast_records_all() -> list[dict]:
+    df = load_forecast_df()
+    df = df.assign(day=df["day"].astype(str))
+    return df.to_dict(orient="records")
+
+
 @lru_cache(maxsize=1)
 def load_metrics_df() -> pd.DataFrame:
     path = _outputs_dir() / "sarima_weather_metrics.csv"
@@ -52,24 +90,34 @@ def forecast_records(
     end: Optional[str] = None,
     limit: Optional[int] = None,
 ) -> list[dict]:
-    df = load_forecast_df().copy()
+    records = _forecast_records_all()
+    days = _forecast_days()
 
+    lo, hi = 0, len(records)
+    if start or end:
+        hi = len(days)
     if start:
         start_date = pd.to_datetime(start).date()
-        df = df[df["day"] >= start_date]
+        lo = bisect_left(days, start_date)
     if end:
         end_date = pd.to_datetime(end).date()
-        df = df[df["day"] <= end_date]
+        hi = bisect_right(days, end_date)
 
     if limit is not None:
-        df = df.head(limit)
+        hi = min(hi, lo + limit)
 
-    df = df.assign(day=df["day"].astype(str))
-    return df.to_dict(orient="records")
+    # Copy the rows so callers cannot mutate the cached records.
+    return [dict(record) for record in records[lo:hi]]
 
 
-def metrics_record() -> dict:
+@lru_cache(maxsize=1)
+def _metrics_record_cached() -> dict:
     df = load_metrics_df()
     if df.empty:
         return {}
     return df.iloc[0].to_dict()
+
+
+def metrics_record() -> dict:
+    # Copy so callers cannot mutate the cached record.
+    return dict(_metrics_record_cached())
@@ -17,13 +17,46 @@ from __future__ import annotations
 
 import argparse
 import json
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Iterable, Optional
 
+import matplotlib
+
+matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+try:
+    import numba
+    from numba import njit, prange
+except ImportError:  # Optional accelerator; fall back to NumPy.
+    numba = None
+
+
+N_SLOTS = 48
+NUMBA_MIN_ROWS = 1_000_000
+PARALLEL_PLOT_MIN_CLUSTERS = 12
+CATEGORICAL_COLUMNS = ("cluster_id", "household_id")
+
+LCL_COLUMNS = {
+    "LCLid": "household_id",
+    "tstp": "timestamp",
+    "energy(kWh/hh)": "consumption_kwh",
+}
+LCL_SCHEMA = pa.schema(
+    [("LCLid", pa.string()), ("tstp", pa.timestamp("ns")), ("energy(kWh/hh)", pa.float64())]
+)
+# Arrow's default null tokens plus the "Null" spelling used in the LCL blocks.
+LCL_NULL_VALUES = [*pacsv.ConvertOptions().null_values, "Null"]
 
 
 def parse_args() -> argparse.Namespace:
@@ -91,11 +124,54 @@ def load_data(path: Path) -> pd.DataFrame:
     missing = required - set(df.columns)
     if missing:
         raise ValueError(f"Missing columns in {path}: {missing}")
-    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
+    raw = df["timestamp"]
+    timestamps = pd.to_datetime(raw, format="ISO8601", utc=True, errors="coerce")
+    # Only keep the ISO fast path when it parsed every value; otherwise infer the layout.
+    if (timestamps.isna() & raw.notna()).any():
+        timestamps = pd.to_datetime(raw, utc=True, errors="coerce")
+    df["timestamp"] = timestamps
     df = df.dropna(subset=["timestamp", "consumption_kwh", "cluster_id", "household_id"])
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype("category")
     return df
 
 
+def _read_lcl_block_coerced(path: Path) -> pa.Table:
+    df = pd.read_csv(path, usecols=LCL_SCHEMA.names)
+    df["tstp"] = pd.to_datetime(df["tstp"], errors="coerce")
+    df["energy(kWh/hh)"] = pd.to_numeric(df["energy(kWh/hh)"], errors="coerce")
+    return pa.Table.from_pandas(df[LCL_SCHEMA.names], schema=LCL_SCHEMA, preserve_index=False)
+
+
+def _read_lcl_block(
+    path: Path,
+    ids: set[str],
+    start: Optional[pd.Timestamp],
+    end: Optional[pd.Timestamp],
+) -> pa.Table:
+    # Only parse the needed columns; Arrow's ISO8601 parser handles the LCL tstp format.
+    try:
+        tbl = pacsv.read_csv(
+            path,
+            convert_options=pacsv.ConvertOptions(
+                include_columns=LCL_SCHEMA.names,
+                column_types=LCL_SCHEMA,
+                null_values=LCL_NULL_VALUES,
+                strings_can_be_null=True,
+            ),
+        )
+    except pa.ArrowInvalid:
+        # A malformed cell breaks Arrow's strict typing; coerce it to null instead.
+        tbl = _read_lcl_block_coerced(path)
+    mask = pc.is_in(tbl["LCLid"], value_set=pa.array(list(ids), type=pa.string()))
+    if start is not None:
+        mask = pc.and_(mask, pc.greater_equal(tbl["tstp"], pa.scalar(start, type=pa.timestamp("ns"))))
+    if end is not None:
+        mask = pc.and_(mask, pc.less_equal(tbl["tstp"], pa.scalar(end, type=pa.timestamp("ns"))))
+    tbl = tbl.filter(mask).drop_null()
+    return tbl.rename_columns([LCL_COLUMNS[name] for name in tbl.column_names])
+
+
 def load_lcl_dataset(
     info_csv: Path,
     blocks_dir: Path,
@@ -116,43 +192,29 @@ def load_lcl_dataset(
         raise SystemExit("No households remain after filtering by cluster.")
     if sample_households:
         info = info.sample(n=min(sample_households, len(info)), random_state=42)
-    households = info["LCLid"].unique()
-    blocks = info.groupby("file")["LCLid"].apply(set).to_dict()
-    frames = []
+    blocks = info.groupby("file", sort=False)["LCLid"].apply(set).to_dict()
+    start = pd.to_datetime(start_date) if start_date else None
+    end = pd.to_datetime(end_date) + pd.Timedelta(days=1) if end_date else None
+    jobs = []
     for block_file, ids in blocks.items():
         block_path = blocks_dir / f"{block_file}.csv"
         if not block_path.exists():
             print(f"Warning: block file missing: {block_path}")
             continue
-        df_block = pd.read_csv(block_path)
-        df_block = df_block.rename(
-            columns={
-                "LCLid": "household_id",
-                "tstp": "timestamp",
-                "energy(kWh/hh)": "consumption_kwh",
-            }
-        )
-        df_block = df_block[df_block["household_id"].isin(ids)]
-        if df_block.empty:
-            continue
-        df_block["timestamp"] = pd.to_datetime(df_block["timestamp"], errors="coerce")
-        df_block["consumption_kwh"] = pd.to_numeric(df_block["consumption_kwh"], errors="coerce")
-        df_block = df_block.dropna(subset=["timestamp", "consumption_kwh"])
-        df_block = df_block.merge(
-            info[["LCLid", cluster_col]].rename(
-                columns={"LCLid": "household_id", cluster_col: "cluster_id"}
-            ),
-            on="household_id",
-            how="left",
-        )
-        if start_date:
-            df_block = df_block[df_block["timestamp"] >= pd.to_datetime(start_date)]
-        if end_date:
-            df_block = df_block[df_block["timestamp"] <= pd.to_datetime(end_date) + pd.Timedelta(days=1)]
-        frames.append(df_block)
+        jobs.append((block_path, ids))
+    # PyArrow releases the GIL while parsing, so blocks can be read concurrently.
+    with ThreadPoolExecutor() as executor:
+        tables = list(executor.map(lambda job: _read_lcl_block(*job, start, end), jobs))
+    frames = [tbl for tbl in tables if tbl.num_rows]
     if not frames:
         raise SystemExit("No data loaded from blocks; check paths and filters.")
-    return pd.concat(frames, ignore_index=True)
+    # concat_tables only links the block chunks; combine them once so each
+    # ArrowDtype column is a single contiguous buffer for the numeric passes.
+    df = pa.concat_tables(frames).combine_chunks().to_pandas(types_mapper=pd.ArrowDtype)
+    df["cluster_id"] = df["household_id"].map(info.set_index("LCLid")[cluster_col])
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype("category")
+    return df
 
 
 def filter_data(
@@ -163,7 +225,10 @@ def filter_data(
     end_date: Optional[str],
 ) -> pd.DataFrame:
     if clusters:
-        df = df[df["cluster_id"].astype(str).isin({str(c) for c in clusters})]
+        # Match against the few categories, then filter rows by category membership.
+        cats = df["cluster_id"].cat.categories
+        keep = cats[cats.astype(str).isin({str(c) for c in clusters})]
+        df = df[df["cluster_id"].isin(keep)]
     if start_date:
         df = df[df["timestamp"] >= pd.to_datetime(start_date, utc=True)]
     if end_date:
@@ -171,52 +236,149 @@ def filter_data(
     if sample_households:
         households = df["household_id"].drop_duplicates()
         sample = households.sample(n=min(sample_households, len(households)), random_state=42)
-        df = df[df["household_id"].isin(sample)]
+        # Compare integer category codes rather than the household id strings.
+        df = df[df["household_id"].cat.codes.isin(sample.cat.codes)]
     return df
 
 
 def add_time_features(df: pd.DataFrame) -> pd.DataFrame:
-    df["is_weekend"] = df["timestamp"].dt.dayofweek >= 5
-    df["slot"] = df["timestamp"].dt.hour * 2 + (df["timestamp"].dt.minute // 30)
+    # Derive all calendar fields from the raw int64 nanoseconds in one pass.
+    ts = df["timestamp"].to_numpy(dtype="datetime64[ns]")
+    ns = ts.view("i8")
+    secs_of_day = (ns // 1_000_000_000) % 86_400
+    hour = secs_of_day // 3_600
+    minute = (secs_of_day % 3_600) // 60
+    # 1970-01-01 was a Thursday (dayofweek 3).
+    df["is_weekend"] = ((ns // 86_400_000_000_000) + 3) % 7 >= 5
+    df["slot"] = (hour * 2 + minute // 30).astype(np.int8)
     # Filter out non half-hour aligned rows to avoid skewing averages.
-    df = df[df["timestamp"].dt.minute.isin([0, 30])]
+    df = df[((minute == 0) | (minute == 30)) & ~np.isnat(ts)]
     return df
 
 
+def _accumulate_numpy(
+    cidx: np.ndarray, wk: np.ndarray, slot: np.ndarray, kwh: np.ndarray, n_clusters: int
+) -> tuple[np.ndarray, np.ndarray]:
+    shape = (n_clusters, 2, N_SLOTS)
+    sums = np.zeros(shape)
+    counts = np.zeros(shape)
+    np.add.at(sums, (cidx, wk, slot), kwh)
+    np.add.at(counts, (cidx, wk, slot), 1)
+    return sums, counts
+
+
+if numba is not None:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _accumulate_numba(cidx, wk, slot, kwh, n_clusters, n_chunks):
+        # One private accumulator per chunk, reduced at the end, so threads never share cells.
+        n = kwh.shape[0]
+        step = (n + n_chunks - 1) // n_chunks
+        sums = np.zeros((n_chunks, n_clusters, 2, N_SLOTS))
+        counts = np.zeros((n_chunks, n_clusters, 2, N_SLOTS))
+        for t in prange(n_chunks):
+            for i in range(t * step, min(n, (t + 1) * step)):
+                sums[t, cidx[i], wk[i], slot[i]] += kwh[i]
+                counts[t, cidx[i], wk[i], slot[i]] += 1.0
+        return sums.sum(axis=0), counts.sum(axis=0)
+
+
+def _accumulate(
+    cidx: np.ndarray, wk: np.ndarray, slot: np.ndarray, kwh: np.ndarray, n_clusters: int
+) -> tuple[np.ndarray, np.ndarray]:
+    # Small inputs finish faster in NumPy than it takes to load or compile the kernel.
+    if numba is None or len(kwh) < NUMBA_MIN_ROWS:
+        return _accumulate_numpy(cidx, wk, slot, kwh, n_clusters)
+    return _accumulate_numba(
+        np.ascontiguousarray(cidx, dtype=np.int64),
+        np.ascontiguousarray(wk, dtype=np.int8),
+        np.ascontiguousarray(slot, dtype=np.int8),
+        np.ascontiguousarray(kwh, dtype=np.float64),
+        n_clusters,
+        numba.get_num_threads(),
+    )
+
+
 def compute_profiles(df: pd.DataFrame) -> pd.DataFrame:
-    grouped = (
-        df.groupby(["cluster_id", "is_weekend", "slot"])["consumption_kwh"]
-        .mean()
-        .reset_index()
-        .rename(columns={"consumption_kwh": "avg_consumption_kwh"})
+    cidx, cluster_ids = pd.factorize(df["cluster_id"], sort=True)
+    wk = df["is_weekend"].to_numpy(np.int8)
+    slot = df["slot"].to_numpy(np.int8)
+    kwh = df["consumption_kwh"].to_numpy(np.float64)
+    # Match groupby semantics: missing keys and values do not contribute.
+    valid = (cidx >= 0) & ~np.isnan(kwh)
+    if not valid.all():
+        cidx, wk, slot, kwh = cidx[valid], wk[valid], slot[valid], kwh[valid]
+
+    # Dense (cluster, is_weekend, slot) accumulator in a single pass.
+    sums, counts = _accumulate(cidx, wk, slot, kwh, len(cluster_ids))
+    means = np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+
+    # Build the wide weekday/weekend frame straight from the dense grid, keeping
+    # only (cluster, slot) pairs that have at least one reading.
+    n_clusters = len(cluster_ids)
+    profiles = pd.DataFrame(
+        {
+            "cluster_id": np.repeat(np.asarray(cluster_ids), N_SLOTS),
+            "slot": np.tile(np.arange(N_SLOTS), n_clusters),
+            "weekday_kwh": means[:, 0, :].ravel(),
+            "weekend_kwh": means[:, 1, :].ravel(),
+        }
     )
-    # Expand to wide format for easier plotting if needed.
-    pivot = grouped.pivot_table(
-        index=["cluster_id", "slot"],
-        columns="is_weekend",
-        values="avg_consumption_kwh",
-    ).reset_index()
-    pivot = pivot.rename(columns={False: "weekday_kwh", True: "weekend_kwh"})
-    return pivot
+    observed = (counts.sum(axis=1) > 0).ravel()
+    return profiles[observed].reset_index(drop=True)
+
+
+def _draw_profile(fig, cluster_id: str, group: dict[str, np.ndarray], out_path: Path) -> None:
+    fig.clear()
+    ax = fig.add_subplot()
+    ax.plot(group["slot"], group["weekday_kwh"], label="Weekday")
+    ax.plot(group["slot"], group["weekend_kwh"], label="Weekend")
+    ax.set_title(f"Cluster {cluster_id}: Average Load Profile")
+    ax.set_xlabel("Half-hour slot (0-47)")
+    ax.set_ylabel("kWh")
+    ax.set_xticks(ticks=range(0, 48, 4), labels=[f"{h:02d}:00" for h in range(0, 24, 2)])
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(out_path, dpi=150)
+
+
+# Each plotting worker process draws every cluster onto one reused figure.
+_WORKER_FIGURE = None
+
+
+def _plot_one(cluster_id: str, group: dict[str, np.ndarray], out_path: Path) -> None:
+    global _WORKER_FIGURE
+    if _WORKER_FIGURE is None:
+        _WORKER_FIGURE = plt.figure(figsize=(10, 5))
+    _draw_profile(_WORKER_FIGURE, cluster_id, group, out_path)
 
 
 def plot_profiles(profiles: pd.DataFrame, out_dir: Path) -> None:
     plot_dir = out_dir / "plots"
     plot_dir.mkdir(parents=True, exist_ok=True)
-    for cluster_id, group in profiles.groupby("cluster_id"):
+    ids, groups, paths = [], [], []
+    for cluster_id, group in profiles.groupby("cluster_id", sort=False, observed=True):
         group = group.sort_values("slot")
-        plt.figure(figsize=(10, 5))
-        plt.plot(group["slot"], group["weekday_kwh"], label="Weekday")
-        plt.plot(group["slot"], group["weekend_kwh"], label="Weekend")
-        plt.title(f"Cluster {cluster_id}: Average Load Profile")
-        plt.xlabel("Half-hour slot (0-47)")
-        plt.ylabel("kWh")
-        plt.xticks(ticks=range(0, 48, 4), labels=[f"{h:02d}:00" for h in range(0, 24, 2)])
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.savefig(plot_dir / f"cluster_{cluster_id}.png", dpi=150)
-        plt.close()
+        ids.append(cluster_id)
+        groups.append({col: group[col].to_numpy() for col in ("slot", "weekday_kwh", "weekend_kwh")})
+        paths.append(plot_dir / f"cluster_{cluster_id}.png")
+    workers = min(len(ids), os.cpu_count() or 1)
+    # Spawned workers re-import pandas/pyarrow/matplotlib, which outweighs a few savefigs.
+    if len(ids) < PARALLEL_PLOT_MIN_CLUSTERS or workers < 2:
+        fig = plt.figure(figsize=(10, 5))
+        try:
+            for args in zip(ids, groups, paths):
+                _draw_profile(fig, *args)
+        finally:
+            plt.close(fig)
+        return
+    # Spawn rather than fork: the parent may already be running Arrow/Numba threads.
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        # Consume the results so worker exceptions are raised here.
+        list(executor.map(_plot_one, ids, groups, paths))
 
 
 def save_outputs(profiles: pd.DataFrame, out_dir: Path) -> None: